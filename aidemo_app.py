@@ -1,13 +1,23 @@
 import streamlit as st
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+import asyncio
 import time
 import json
+import logging
 import os
-import tiktoken
+import re
+import secrets
+import sqlite3
+import threading
+from collections import OrderedDict, deque
 import hashlib
-from datetime import datetime, timedelta, date
+from datetime import date
 import tempfile
 from dotenv import load_dotenv
+from tokens import PRICING, count_tokens, calculate_cost
+from ratelimit import window_count, release_count
+from streaming import stream_text, streamed_tokens
+from history import render_history
 
 # Load environment variables from .env file for local testing
 load_dotenv()
@@ -19,135 +29,263 @@ st.set_page_config(
     layout="wide"
 )
 
+# --- DEMO LIMITS ---
+DAILY_CAP = 1.0  # $1 per day, across all users
+MAX_INPUT_CHARS = 500
+MAX_REQUESTS_10MIN = 5
+MAX_REQUESTS_HOUR = 15
+MAX_SESSION_TOKENS = 50_000  # Roughly $0.05 worth per session
+WINDOW_10MIN = 600.0  # Seconds
+WINDOW_HOUR = 3600.0  # Seconds
+
+# Request types blocked by validate_input as too expensive for the demo
+EXPENSIVE_KEYWORDS = (
+    'write a book', 'write a novel', 'generate 1000', 'list everything',
+    'write code for', 'create a complete', 'translate entire', 'summarize this book'
+)
+
 # --- GLOBAL DAILY CAP FUNCTIONS ---
-def get_daily_tracking_file():
-    """Get path to daily tracking file in temp directory"""
-    temp_dir = tempfile.gettempdir()
-    return os.path.join(temp_dir, "ai_explorer_daily.json")
+@st.cache_resource
+def get_usage_db():
+    """Daily usage database connection, opened once per process, and the lock guarding it"""
+    db_path = os.path.join(tempfile.gettempdir(), "ai_explorer_usage.db")
+    # Every session thread shares this connection, so access goes through the lock;
+    # WAL lets other app processes on the host read the file while this one writes
+    conn = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS usage "
+        "(date TEXT PRIMARY KEY, cost REAL NOT NULL DEFAULT 0, tokens INTEGER NOT NULL DEFAULT 0)"
+    )
+    return conn, threading.Lock()
 
 def load_daily_tracking():
-    """Load daily tracking data"""
-    tracking_file = get_daily_tracking_file()
-    if os.path.exists(tracking_file):
-        try:
-            with open(tracking_file, 'r') as f:
-                return json.load(f)
-        except:
-            return {"date": str(date.today()), "cost": 0.0}
-    return {"date": str(date.today()), "cost": 0.0}
-
-def save_daily_tracking(data):
-    """Save daily tracking data"""
-    tracking_file = get_daily_tracking_file()
-    with open(tracking_file, 'w') as f:
-        json.dump(data, f)
+    """Load today's tracking data (a new day simply has no row yet)"""
+    today = str(date.today())
+    conn, lock = get_usage_db()
+    with lock:
+        row = conn.execute("SELECT cost FROM usage WHERE date = ?", (today,)).fetchone()
+    return {"date": today, "cost": row[0] if row else 0.0}
 
 def check_daily_cap(estimated_cost):
     """Check if adding this cost would exceed daily cap"""
-    tracking = load_daily_tracking()
-    today = str(date.today())
-    
-    # Reset if it's a new day
-    if tracking["date"] != today:
-        tracking = {"date": today, "cost": 0.0}
-        save_daily_tracking(tracking)
+    try:
+        tracking = load_daily_tracking()
+    except sqlite3.Error as e:
+        # Fail closed - without today's total the cap can't be enforced
+        st.error(f"Error loading daily stats: {str(e)}")
+        return False
     
     # Check if we would exceed the daily cap
-    daily_cap = 1.0  # $1 per day
-    if tracking["cost"] + estimated_cost > daily_cap:
-        st.error(f"💰 Daily spending limit of ${daily_cap} reached! Please try again tomorrow.")
+    if tracking["cost"] + estimated_cost > DAILY_CAP:
+        st.error(f"💰 Daily spending limit of ${DAILY_CAP} reached! Please try again tomorrow.")
         st.info("This helps keep the demo free for everyone. The limit resets at midnight UTC.")
         return False
     
     return True
 
-def update_daily_cost(cost):
-    """Update the daily cost after a successful request"""
-    tracking = load_daily_tracking()
-    today = str(date.today())
-    
-    # Reset if it's a new day
-    if tracking["date"] != today:
-        tracking = {"date": today, "cost": cost}
-    else:
-        tracking["cost"] += cost
-    
-    save_daily_tracking(tracking)
+def update_daily_cost(cost, tokens=0):
+    """Add to today's cost and token totals. Returns False if it couldn't be saved"""
+    try:
+        conn, lock = get_usage_db()
+        # Single atomic upsert, so concurrent sessions can't overwrite each other's totals
+        with lock:
+            conn.execute(
+                "INSERT INTO usage (date, cost, tokens) VALUES (?, ?, ?) "
+                "ON CONFLICT(date) DO UPDATE SET cost = cost + excluded.cost, tokens = tokens + excluded.tokens",
+                (str(date.today()), cost, tokens)
+            )
+    except sqlite3.Error as e:
+        st.error(f"Error saving daily stats: {str(e)}")
+        return False
+    return True
+
+# --- SHARED RATE LIMIT FUNCTIONS ---
+REDIS_TIMEOUT = 0.5  # Seconds - an unreachable Redis must not stall every rerun
+REDIS_RETRY_AFTER = 60.0  # Seconds to rely on per-session limits after a Redis error
+
+logger = logging.getLogger(__name__)
+
+# Trims the user's request log, counts both windows and adds the new requests (ARGV[6..])
+# only if they fit - all in one step, so parallel submits can't all pass the same count
+_CLAIM_REQUESTS_LUA = """
+local now = tonumber(ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - tonumber(ARGV[3]))
+local last_10_min = redis.call('ZCOUNT', KEYS[1], now - tonumber(ARGV[2]), '+inf')
+local last_hour = redis.call('ZCARD', KEYS[1])
+local n = #ARGV - 5
+if last_10_min + n > tonumber(ARGV[4]) or last_hour + n > tonumber(ARGV[5]) then
+    return {0, last_10_min, last_hour}
+end
+for i = 6, #ARGV do
+    redis.call('ZADD', KEYS[1], ARGV[1], ARGV[i])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return {1, last_10_min, last_hour}
+"""
+
+# Connect once per URL, shared across sessions and reruns
+@st.cache_resource
+def connect_redis(url):
+    """Connect to Redis at a URL"""
+    # Optional dependency, only needed when REDIS_URL is configured
+    import redis
+    return redis.Redis.from_url(url, socket_connect_timeout=REDIS_TIMEOUT, socket_timeout=REDIS_TIMEOUT)
+
+def get_redis():
+    """Get Redis for rate limiting shared across app replicas (None if REDIS_URL isn't set)"""
+    # The URL is looked up on every call, so one added later is picked up without a restart
+    url = None
+    try:
+        if hasattr(st, 'secrets') and "REDIS_URL" in st.secrets:
+            url = st.secrets["REDIS_URL"]
+    except:
+        pass
+    if not url:
+        url = os.getenv("REDIS_URL")
+    if not url:
+        return None
+    return connect_redis(url)  # Raises ImportError without the redis package - callers back off
+
+@st.cache_resource
+def get_redis_backoff():
+    """Process-wide monotonic time until which Redis is skipped after an error"""
+    return {"until": 0.0}
+
+def shared_redis():
+    """Return the Redis client to use now (None if it isn't configured or is backing off after an error)"""
+    if time.monotonic() < get_redis_backoff()["until"]:
+        return None
+    return get_redis()
+
+def redis_failed(error):
+    """Skip Redis for a while after an error, so an outage doesn't slow down every request"""
+    get_redis_backoff()["until"] = time.monotonic() + REDIS_RETRY_AFTER
+    logger.warning("Redis rate limiting unavailable, using per-session limits for %.0fs: %s", REDIS_RETRY_AFTER, error)
+
+def rate_limit_key():
+    """Redis key for the current user - the client IP when known, otherwise the session"""
+    try:
+        forwarded_for = st.context.headers.get("X-Forwarded-For")
+    except AttributeError:
+        forwarded_for = None
+    if forwarded_for:
+        # Only the last hop is added by our proxy - anything left of it is whatever the client sent
+        return f"ai_explorer:rl:ip:{forwarded_for.split(',')[-1].strip()}"
+    return f"ai_explorer:rl:session:{st.session_state.session_id}"
+
+def claim_shared_requests(redis_client, n):
+    """Add n requests to the user's Redis request log if they fit - returns (entries or None, counts before them)"""
+    now = time.time()
+    members = [f"{now}:{secrets.token_hex(4)}" for _ in range(n)]
+    claim = redis_client.register_script(_CLAIM_REQUESTS_LUA)
+    allowed, last_10_min, last_hour = claim(
+        keys=[rate_limit_key()],
+        args=[now, WINDOW_10MIN, int(WINDOW_HOUR), MAX_REQUESTS_10MIN, MAX_REQUESTS_HOUR, *members]
+    )
+    return (members if allowed else None), (last_10_min, last_hour)
+
+def release_shared_requests(redis_client, members):
+    """Remove claimed requests from the user's Redis request log"""
+    redis_client.zrem(rate_limit_key(), *members)
 
 # --- ABUSE PREVENTION FUNCTIONS ---
-def check_rate_limit():
-    """Prevent users from spamming requests"""
+def check_rate_limit(n=1):
+    """Claim n requests against the rate limits. Returns their Redis entries ([] without Redis), or None if over a limit"""
     
     # Get user identifier (IP-based session)
     if 'session_id' not in st.session_state:
-        st.session_state.session_id = hashlib.md5(str(time.time()).encode()).hexdigest()[:8]
+        st.session_state.session_id = secrets.token_hex(4)
     
-    # Initialize rate limiting variables
-    if 'requests' not in st.session_state:
-        st.session_state.requests = []
+    # Initialize rate limiting variables - one sliding-window counter per limit
+    current_time = time.monotonic()
+    if 'rl_10min' not in st.session_state:
+        st.session_state.rl_10min = {"start": current_time, "prev": 0, "curr": 0}
+        st.session_state.rl_hour = {"start": current_time, "prev": 0, "curr": 0}
     if 'session_tokens' not in st.session_state:
         st.session_state.session_tokens = 0
     
-    # Clean old requests (older than 1 hour)
-    current_time = datetime.now()
-    st.session_state.requests = [
-        req_time for req_time in st.session_state.requests 
-        if current_time - req_time < timedelta(hours=1)
-    ]
-    
-    # Check limits
-    requests_last_hour = len(st.session_state.requests)
-    requests_last_10_min = len([
-        req_time for req_time in st.session_state.requests 
-        if current_time - req_time < timedelta(minutes=10)
-    ])
+    if st.session_state.session_tokens > MAX_SESSION_TOKENS:
+        st.error("💰 Token limit reached for this session! Please refresh the page to continue.")
+        st.info("This demo has spending limits to keep it free for everyone.")
+        return None
+    
+    # Check limits - this session's own counters always apply
+    requests_last_10_min = window_count(st.session_state.rl_10min, current_time, WINDOW_10MIN)
+    requests_last_hour = window_count(st.session_state.rl_hour, current_time, WINDOW_HOUR)
+    claimed = []
+    if requests_last_10_min + n <= MAX_REQUESTS_10MIN and requests_last_hour + n <= MAX_REQUESTS_HOUR:
+        # Other replicas' requests count too - Redis checks and claims them in one step
+        try:
+            redis_client = shared_redis()
+            if redis_client is not None:
+                claimed, shared = claim_shared_requests(redis_client, n)
+                requests_last_10_min = max(requests_last_10_min, shared[0])
+                requests_last_hour = max(requests_last_hour, shared[1])
+        except Exception as e:
+            claimed = []
+            redis_failed(e)  # Fall back to this session's own counters
     
     # Rate limits
-    if requests_last_10_min >= 5:
-        st.error("⏰ Slow down! Maximum 5 requests per 10 minutes. Please wait before trying again.")
-        st.info(f"You've made {requests_last_10_min} requests in the last 10 minutes.")
-        return False
-    
-    if requests_last_hour >= 15:
-        st.error("⏰ Daily limit reached! Maximum 15 requests per hour for this demo.")
+    if requests_last_10_min + n > MAX_REQUESTS_10MIN:
+        st.error(f"⏰ Slow down! Maximum {MAX_REQUESTS_10MIN} requests per 10 minutes. Please wait before trying again.")
+        needed = f", and this needs {n} more" if n > 1 else ""
+        st.info(f"You've made about {requests_last_10_min:.0f} requests in the last 10 minutes{needed}.")
+        return None
+    
+    if requests_last_hour + n > MAX_REQUESTS_HOUR:
+        st.error(f"⏰ Daily limit reached! Maximum {MAX_REQUESTS_HOUR} requests per hour for this demo.")
         st.info("This helps keep the demo available for everyone. Try again in an hour!")
-        return False
+        return None
     
-    if st.session_state.session_tokens > 50000:  # Roughly $0.05 worth per session
-        st.error("💰 Token limit reached for this session! Please refresh the page to continue.")
-        st.info("This demo has spending limits to keep it free for everyone.")
-        return False
+    log_request(n)
+    return claimed
+
+def log_request(n=1):
+    """Count n requests against this session's limits"""
+    current_time = time.monotonic()
+    for counter, window in ((st.session_state.rl_10min, WINDOW_10MIN), (st.session_state.rl_hour, WINDOW_HOUR)):
+        window_count(counter, current_time, window)  # Roll forward before counting
+        counter["curr"] += n
+
+def release_requests(claimed, n=1):
+    """Give back n claimed requests that won't be made, along with their Redis entries"""
+    current_time = time.monotonic()
+    release_count(st.session_state.rl_10min, current_time, WINDOW_10MIN, n)
+    release_count(st.session_state.rl_hour, current_time, WINDOW_HOUR, n)
     
-    return True
+    if claimed:
+        try:
+            redis_client = shared_redis()
+            if redis_client is not None:
+                release_shared_requests(redis_client, claimed)
+        except Exception as e:
+            redis_failed(e)
 
-def log_request():
-    """Log a successful request"""
-    st.session_state.requests.append(datetime.now())
+# Expensive request types, compiled once so the input is scanned in a single pass
+_EXPENSIVE_RE = re.compile("|".join(map(re.escape, EXPENSIVE_KEYWORDS)), re.IGNORECASE)
 
 def validate_input(user_input):
     """Prevent abusive or expensive inputs"""
     
-    if not user_input or len(user_input.strip()) == 0:
+    if not user_input or user_input.isspace():  # No stripped copy needed
         st.error("Please enter a prompt.")
         return False
     
-    if len(user_input) > 500:  # Limit input length
-        st.error("Please keep your prompt under 500 characters for this demo.")
+    if len(user_input) > MAX_INPUT_CHARS:  # Limit input length
+        st.error(f"Please keep your prompt under {MAX_INPUT_CHARS} characters for this demo.")
         return False
     
     # Check for repetitive patterns (spam detection)
     words = user_input.lower().split()
-    if len(words) > 5 and len(set(words)) < len(words) / 3:
+    word_count = len(words)
+    if word_count > 5 and len(set(words)) * 3 < word_count:
         st.warning("This looks like repetitive text. Please enter a genuine prompt.")
         return False
     
     # Block certain expensive request types
-    expensive_keywords = [
-        'write a book', 'write a novel', 'generate 1000', 'list everything',
-        'write code for', 'create a complete', 'translate entire', 'summarize this book'
-    ]
-    
-    if any(keyword in user_input.lower() for keyword in expensive_keywords):
+    if _EXPENSIVE_RE.search(user_input):
         st.warning("This demo is for educational prompts only. Please try a shorter, more specific request.")
         return False
     
@@ -162,16 +300,24 @@ This tool demonstrates that AI models are sophisticated **word prediction system
 Small changes in parameters can dramatically alter outputs, showing the probabilistic nature of AI.
 """)
 
+# Response history size; the oldest entry is dropped once it is full
+MAX_HISTORY = 20
+
 # Initialize session state
 if 'responses' not in st.session_state:
-    st.session_state.responses = []
+    st.session_state.responses = deque(maxlen=MAX_HISTORY)
 if 'total_cost' not in st.session_state:
     st.session_state.total_cost = 0.0
-if 'client' not in st.session_state:
-    st.session_state.client = None
 
-# Try to initialize OpenAI client with dual support
-try:
+# Create the OpenAI client once per API key, shared across sessions and reruns
+@st.cache_resource
+def build_openai_client(api_key):
+    """Build the OpenAI client for an API key"""
+    return OpenAI(api_key=api_key)
+
+def get_openai_client():
+    """Get the OpenAI client for the key in Streamlit secrets or the environment"""
+    # The key is looked up on every rerun, so one added later is picked up without a restart
     api_key = None
     
     # Try Streamlit secrets first (for Streamlit Cloud)
@@ -185,42 +331,105 @@ try:
     if not api_key:
         api_key = os.getenv("OPENAI_API_KEY")
     
-    if api_key and st.session_state.client is None:
-        st.session_state.client = OpenAI(api_key=api_key)
-    elif not api_key:
-        st.session_state.client = None
-    
+    if not api_key:
+        return None
+    return build_openai_client(api_key)
+
+try:
+    client = get_openai_client()
 except Exception as e:
-    st.session_state.client = None
-
-# OpenAI pricing (per 1K tokens) - updated as of Jan 2024
-PRICING = {
-    "gpt-3.5-turbo": {"input": 0.0010, "output": 0.0020},
-    "gpt-4": {"input": 0.03, "output": 0.06},
-    "gpt-4-turbo": {"input": 0.01, "output": 0.03},
-    "gpt-4-turbo-preview": {"input": 0.01, "output": 0.03}
-}
-
-def count_tokens(text, model):
-    """Count tokens in text using tiktoken"""
-    try:
-        if model.startswith("gpt-4"):
-            encoding = tiktoken.encoding_for_model("gpt-4")
-        else:
-            encoding = tiktoken.encoding_for_model("gpt-3.5-turbo")
-        return len(encoding.encode(text))
-    except:
-        # Fallback estimation: ~4 chars per token
-        return len(text) // 4
+    client = None
+
+# Responses kept for reuse by any session, keyed by request contents, oldest evicted first
+RESPONSE_CACHE_SIZE = 256
+RESPONSE_CACHE_TTL = 24 * 60 * 60  # Seconds
+
+@st.cache_resource
+def get_response_cache():
+    """Process-wide response cache (key -> (stored_at, response_data)) and the lock guarding it"""
+    return OrderedDict(), threading.Lock()
+
+def response_cache_key(model, prompt, parameters):
+    """Hash the prompt, model and sampling parameters into a response cache key"""
+    # Surrounding whitespace doesn't change the request, so it doesn't split the cache
+    payload = json.dumps([prompt.strip(), model, parameters], sort_keys=True)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+def reserve_request(estimated_cost):
+    """Hold a request's estimated cost against the daily cap before calling the API"""
+    return update_daily_cost(estimated_cost)
+
+def settle_request(model, estimated_cost, input_tokens, output_tokens):
+    """Replace a request's reserved estimate with its actual cost and return that cost"""
+    actual_cost = calculate_cost(input_tokens, output_tokens, model)
+    
+    # Update session tracking
+    st.session_state.total_cost += actual_cost
+    st.session_state.session_tokens += input_tokens + output_tokens
+    
+    # Update daily cost tracking
+    update_daily_cost(actual_cost - estimated_cost, input_tokens + output_tokens)
+    return actual_cost
+
+def record_response(model, prompt, response_text, input_tokens, output_tokens, cost, parameters):
+    """Add a completed request to the response history"""
+    # Store response with parameters
+    response_data = {
+        "timestamp": time.strftime("%H:%M:%S"),
+        "model": model,
+        "prompt": prompt,
+        "response": response_text,
+        "cost": cost,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "parameters": parameters
+    }
+    st.session_state.responses.appendleft(response_data)
+    
+    # Remember it so an identical request from any session can be answered without an API call
+    cache, lock = get_response_cache()
+    with lock:
+        cache[response_cache_key(model, prompt, parameters)] = (time.monotonic(), response_data)
+        if len(cache) > RESPONSE_CACHE_SIZE:
+            cache.popitem(last=False)
+
+def reuse_cached_response(cache_key):
+    """Add a cached response to the history again, at no cost. Returns False on a cache miss"""
+    cache, lock = get_response_cache()
+    with lock:
+        entry = cache.get(cache_key)
+        if entry is None:
+            return False
+        stored_at, cached = entry
+        if time.monotonic() - stored_at > RESPONSE_CACHE_TTL:
+            del cache[cache_key]
+            return False
+        cache.move_to_end(cache_key)
+    
+    st.session_state.responses.appendleft({
+        **cached,
+        "timestamp": time.strftime("%H:%M:%S"),
+        "cost": 0.0,
+        "cached": True
+    })
+    return True
 
-def calculate_cost(input_tokens, output_tokens, model):
-    """Calculate cost based on token usage"""
-    if model not in PRICING:
-        return 0.0
-    
-    input_cost = (input_tokens / 1000) * PRICING[model]["input"]
-    output_cost = (output_tokens / 1000) * PRICING[model]["output"]
-    return input_cost + output_cost
+# Temperatures compared by the sweep button - kept well under MAX_REQUESTS_10MIN,
+# since a sweep needs one rate-limit slot per temperature
+SWEEP_TEMPERATURES = [0.0, 1.0, 2.0]
+
+async def run_sweep(api_key, model, prompt, temperatures, **params):
+    """Request one completion per temperature concurrently (a failed call yields its exception)"""
+    async with AsyncOpenAI(api_key=api_key) as async_client:
+        return await asyncio.gather(*[
+            async_client.chat.completions.create(
+                model=model,
+                messages=[{"role": "user", "content": prompt}],
+                temperature=temperature,
+                **params
+            )
+            for temperature in temperatures
+        ], return_exceptions=True)
 
 # Sidebar for API configuration and usage stats
 with st.sidebar:
@@ -229,20 +438,18 @@ with st.sidebar:
     # Daily global cap tracking
     try:
         daily_tracking = load_daily_tracking()
-        daily_percentage = (daily_tracking["cost"] / 1.0) * 100
-        st.metric("Daily Usage", f"${daily_tracking['cost']:.4f}/$1.00")
+        daily_percentage = (daily_tracking["cost"] / DAILY_CAP) * 100
+        st.metric("Daily Usage", f"${daily_tracking['cost']:.4f}/${DAILY_CAP:.2f}")
         st.progress(min(daily_percentage / 100, 1.0))
     except Exception as e:
         st.error(f"Error loading daily stats: {str(e)}")
     
     # Session-specific tracking
-    if 'requests' in st.session_state and 'session_tokens' in st.session_state:
-        recent_requests = len([
-            req_time for req_time in st.session_state.requests 
-            if datetime.now() - req_time < timedelta(minutes=10)
-        ])
-        st.metric("Requests (last 10 min)", f"{recent_requests}/5")
-        st.metric("Session Tokens", f"{st.session_state.session_tokens:,}/50,000")
+    if 'rl_10min' in st.session_state and 'session_tokens' in st.session_state:
+        # This session's own count - the sidebar renders on every rerun, so it doesn't query Redis
+        recent_requests = window_count(st.session_state.rl_10min, time.monotonic(), WINDOW_10MIN)
+        st.metric("Requests (last 10 min)", f"{recent_requests:.0f}/{MAX_REQUESTS_10MIN}")
+        st.metric("Session Tokens", f"{st.session_state.session_tokens:,}/{MAX_SESSION_TOKENS:,}")
         st.metric("Session Cost", f"${st.session_state.total_cost:.4f}")
     
     st.info("💡 This demo has usage limits to prevent abuse and keep it free for everyone!")
@@ -256,6 +463,13 @@ with st.sidebar:
         ["gpt-3.5-turbo", "gpt-4", "gpt-4-turbo"],
         index=0
     )
+    
+    # Identical requests can be answered from the response cache shared by all sessions instead of the API
+    use_cache = st.checkbox(
+        "💾 Reuse identical requests",
+        value=True,
+        help="Skip the API call when the prompt, model and parameters match a request made in the last 24 hours. Turn off to sample a fresh response."
+    )
 
 # Main content area
 col1, col2 = st.columns([1, 1])
@@ -263,66 +477,77 @@ col1, col2 = st.columns([1, 1])
 with col1:
     st.header("🎛️ Input & Parameters")
     
-    # Prompt input with protection
-    prompt = st.text_area(
-        "Your Prompt",
-        value="Write a short story about a robot learning to paint.",
-        height=100,
-        max_chars=500,  # Enforce character limit for protection
-        help="Enter the prompt you want to test with different parameters (max 500 characters)"
-    )
-    
-    st.subheader("🎛️ Model Parameters")
-    
-    # Temperature slider
-    temperature = st.slider(
-        "Temperature",
-        min_value=0.0,
-        max_value=2.0,
-        value=1.0,
-        step=0.1,
-        help="Controls randomness. Higher = more creative/random, Lower = more focused/deterministic"
-    )
-    
-    # Top-p slider
-    top_p = st.slider(
-        "Top-p (Nucleus Sampling)",
-        min_value=0.1,
-        max_value=1.0,
-        value=1.0,
-        step=0.1,
-        help="Controls diversity via nucleus sampling. Lower = more focused vocabulary"
-    )
-    
-    # Max tokens - limited for demo protection
-    max_tokens = st.slider(
-        "Max Tokens",
-        min_value=50,
-        max_value=300,  # Reduced max for demo protection
-        value=150,
-        step=25,
-        help="Maximum length of the response"
-    )
-    
-    # Frequency penalty
-    frequency_penalty = st.slider(
-        "Frequency Penalty",
-        min_value=0.0,
-        max_value=2.0,
-        value=0.0,
-        step=0.1,
-        help="Reduces repetition. Higher = less likely to repeat tokens"
-    )
-    
-    # Presence penalty
-    presence_penalty = st.slider(
-        "Presence Penalty",
-        min_value=0.0,
-        max_value=2.0,
-        value=0.0,
-        step=0.1,
-        help="Encourages talking about new topics. Higher = more likely to introduce new topics"
-    )
+    # Parameters are batched in a form so only submitting reruns the script
+    with st.form("params"):
+        # Prompt input with protection
+        prompt = st.text_area(
+            "Your Prompt",
+            value="Write a short story about a robot learning to paint.",
+            height=100,
+            max_chars=MAX_INPUT_CHARS,  # Enforce character limit for protection
+            help=f"Enter the prompt you want to test with different parameters (max {MAX_INPUT_CHARS} characters)"
+        )
+        
+        st.subheader("🎛️ Model Parameters")
+        
+        # Temperature slider
+        temperature = st.slider(
+            "Temperature",
+            min_value=0.0,
+            max_value=2.0,
+            value=1.0,
+            step=0.1,
+            help="Controls randomness. Higher = more creative/random, Lower = more focused/deterministic"
+        )
+        
+        # Top-p slider
+        top_p = st.slider(
+            "Top-p (Nucleus Sampling)",
+            min_value=0.1,
+            max_value=1.0,
+            value=1.0,
+            step=0.1,
+            help="Controls diversity via nucleus sampling. Lower = more focused vocabulary"
+        )
+        
+        # Max tokens - limited for demo protection
+        max_tokens = st.slider(
+            "Max Tokens",
+            min_value=50,
+            max_value=300,  # Reduced max for demo protection
+            value=150,
+            step=25,
+            help="Maximum length of the response"
+        )
+        
+        # Frequency penalty
+        frequency_penalty = st.slider(
+            "Frequency Penalty",
+            min_value=0.0,
+            max_value=2.0,
+            value=0.0,
+            step=0.1,
+            help="Reduces repetition. Higher = less likely to repeat tokens"
+        )
+        
+        # Presence penalty
+        presence_penalty = st.slider(
+            "Presence Penalty",
+            min_value=0.0,
+            max_value=2.0,
+            value=0.0,
+            step=0.1,
+            help="Encourages talking about new topics. Higher = more likely to introduce new topics"
+        )
+        
+        # Submit buttons - slider and text changes don't rerun the app until one is pressed
+        generate = st.form_submit_button("🚀 Generate Response", type="primary", disabled=not client)
+        sweep_size = len(SWEEP_TEMPERATURES)
+        sweep = st.form_submit_button(
+            f"🌡️ Run {sweep_size} temperatures",
+            disabled=not client,
+            help=f"Compare temperatures {', '.join(map(str, SWEEP_TEMPERATURES))} side by side. Uses {sweep_size} of your {MAX_REQUESTS_10MIN} requests per 10 minutes"
+        )
 
 with col2:
     st.header("🎯 Results")
@@ -336,7 +561,7 @@ with col2:
     except:
         pass
     
-    if st.session_state.client:
+    if client:
         if api_key_secrets:
             st.success("🟢 OpenAI client ready (using Streamlit secrets)")
         elif api_key_env:
@@ -355,78 +580,145 @@ with col2:
         st.metric("💰 Total Session Cost", f"${st.session_state.total_cost:.4f}")
     
     # Generate button with full protection
-    if st.button("🚀 Generate Response", type="primary", disabled=not st.session_state.client):
+    if generate:
         
         # Validate input
         if not validate_input(prompt):
             st.stop()
         
-        # Check rate limits
-        if not check_rate_limit():
-            st.stop()
-        
-        # Estimate cost for daily cap check
-        input_tokens = count_tokens(prompt, model)
-        estimated_output_tokens = max_tokens  # Worst-case scenario
-        estimated_cost = calculate_cost(input_tokens, estimated_output_tokens, model)
+        parameters = {
+            "temperature": temperature,
+            "top_p": top_p,
+            "max_tokens": max_tokens,
+            "frequency_penalty": frequency_penalty,
+            "presence_penalty": presence_penalty
+        }
+        cache_key = response_cache_key(model, prompt, parameters)
         
-        # Check daily cap
-        if not check_daily_cap(estimated_cost):
-            st.stop()
+        # Identical earlier request - reuse it without touching the API or the limits
+        if use_cache and reuse_cached_response(cache_key):
+            st.success("💾 Reused a cached response - no API call made")
+        else:
+            # Check rate limits
+            claimed = check_rate_limit()
+            if claimed is None:
+                st.stop()
             
-        with st.spinner("Generating response..."):
+            # Estimate cost for daily cap check
+            input_tokens = count_tokens(prompt, model)
+            estimated_output_tokens = max_tokens  # Worst-case scenario
+            estimated_cost = calculate_cost(input_tokens, estimated_output_tokens, model)
+            
+            # Check daily cap, then hold the worst-case cost up front - write_stream makes
+            # Streamlit calls, so a rerun can interrupt it after the tokens are billed
+            if not check_daily_cap(estimated_cost) or not reserve_request(estimated_cost):
+                release_requests(claimed)
+                st.stop()
+            
+            stream_stats = {}
+            response_text = None
             try:
-                # Make API call
-                response = st.session_state.client.chat.completions.create(
+                # Make API call, streaming so text appears as soon as it is generated
+                response = client.chat.completions.create(
                     model=model,
                     messages=[{"role": "user", "content": prompt}],
                     temperature=temperature,
                     top_p=top_p,
                     max_tokens=max_tokens,
                     frequency_penalty=frequency_penalty,
-                    presence_penalty=presence_penalty
+                    presence_penalty=presence_penalty,
+                    stream=True,
+                    stream_options={"include_usage": True}
                 )
+                stream_stats["parts"] = []  # The prompt is billed from here on
                 
-                # Extract response text
-                response_text = response.choices[0].message.content
-                
-                # Calculate actual costs
-                input_tokens = count_tokens(prompt, model)
-                output_tokens = count_tokens(response_text, model)
-                actual_cost = calculate_cost(input_tokens, output_tokens, model)
-                total_tokens = input_tokens + output_tokens
-                
-                # Update session tracking
-                st.session_state.total_cost += actual_cost
-                st.session_state.session_tokens += total_tokens
-                log_request()  # Log successful request
-                
-                # Update daily cost tracking
-                update_daily_cost(actual_cost)
-                
-                # Store response with parameters
-                response_data = {
-                    "timestamp": time.strftime("%H:%M:%S"),
-                    "model": model,
-                    "prompt": prompt,
-                    "response": response_text,
-                    "cost": actual_cost,
-                    "input_tokens": input_tokens,
-                    "output_tokens": output_tokens,
-                    "parameters": {
-                        "temperature": temperature,
-                        "top_p": top_p,
-                        "max_tokens": max_tokens,
-                        "frequency_penalty": frequency_penalty,
-                        "presence_penalty": presence_penalty
-                    }
-                }
-                
-                st.session_state.responses.insert(0, response_data)
-                st.success("✅ Response generated!")
+                # write_stream appends each delta instead of re-rendering the whole text
+                placeholder = st.empty()
+                response_text = placeholder.write_stream(stream_text(response, stream_stats))
+                placeholder.empty()  # Shown in the response history below
                 
             except Exception as e:
                 st.error(f"⚠️ Error: {str(e)}")
+            finally:
+                # Settle the actual cost from the token counts OpenAI bills for, even when interrupted
+                input_tokens, output_tokens = streamed_tokens(stream_stats, prompt, model)
+                actual_cost = settle_request(model, estimated_cost, input_tokens, output_tokens)
+                if "parts" not in stream_stats:
+                    release_requests(claimed)  # Never reached the API - failures don't use up quota
+            
+            if response_text is not None:
+                record_response(model, prompt, response_text, input_tokens, output_tokens, actual_cost, parameters)
+                st.success("✅ Response generated!")
+    
+    # Parameter sweep - same prompt at several temperatures, requested concurrently
+    if sweep:
+        
+        # Same protections as a single request, scaled to the sweep size
+        if not validate_input(prompt):
+            st.stop()
+        
+        claimed = check_rate_limit(sweep_size)
+        if claimed is None:
+            st.stop()
+        
+        input_tokens = count_tokens(prompt, model)
+        estimated_cost = calculate_cost(input_tokens, max_tokens, model) * sweep_size
+        
+        if not check_daily_cap(estimated_cost) or not reserve_request(estimated_cost):
+            release_requests(claimed, sweep_size)
+            st.stop()
+        
+        call_estimate = estimated_cost / sweep_size
+        responses = [None] * sweep_size  # None - the call never ran
+        costs = [0.0] * sweep_size
+        sweep_error = None
+        try:
+            with st.spinner(f"Generating {sweep_size} responses..."):
+                responses = asyncio.run(run_sweep(
+                    client.api_key, model, prompt, SWEEP_TEMPERATURES,
+                    top_p=top_p,
+                    max_tokens=max_tokens,
+                    frequency_penalty=frequency_penalty,
+                    presence_penalty=presence_penalty
+                ))
+        except Exception as e:
+            sweep_error = e  # Reported below, once every call is settled
+        finally:
+            # Settle every call before the next Streamlit call, where a rerun can interrupt the script
+            for i, response in enumerate(responses):
+                if response is None or isinstance(response, BaseException):
+                    # Nothing came back - release its reservation and its rate-limit slot
+                    settle_request(model, call_estimate, 0, 0)
+                    release_requests(claimed[i:i + 1])
+                else:
+                    costs[i] = settle_request(
+                        model, call_estimate, response.usage.prompt_tokens, response.usage.completion_tokens
+                    )
+        
+        if sweep_error is not None:
+            st.error(f"⚠️ Error: {str(sweep_error)}")
+        
+        # Record in reverse so the lowest temperature ends up on top
+        generated = 0
+        for sweep_temperature, response, cost in reversed(list(zip(SWEEP_TEMPERATURES, responses, costs))):
+            if response is None:
+                continue
+            if isinstance(response, BaseException):
+                st.error(f"⚠️ Error at temperature {sweep_temperature}: {str(response)}")
+                continue
+            
+            record_response(
+                model, prompt, response.choices[0].message.content,
+                response.usage.prompt_tokens, response.usage.completion_tokens, cost, {
+                    "temperature": sweep_temperature,
+                    "top_p": top_p,
+                    "max_tokens": max_tokens,
+                    "frequency_penalty": frequency_penalty,
+                    "presence_penalty": presence_penalty
+                })
+            generated += 1
+        if generated:
+            st.success(f"✅ {generated} of {sweep_size} responses generated!")
     
     # Display responses
     if st.session_state.responses:
@@ -434,150 +726,36 @@ with col2:
         
         # Clear history button
         if st.button("🗑️ Clear History"):
-            st.session_state.responses = []
+            st.session_state.responses.clear()
             st.session_state.total_cost = 0.0
             st.rerun()
         
-        # Display each response
-        for i, resp in enumerate(st.session_state.responses):
-            with st.expander(f"Response {i+1} - {resp['timestamp']} - ${resp['cost']:.4f}", expanded=(i==0)):
-                st.write("**Response:**")
-                st.write(resp['response'])
-                
-                col_cost, col_tokens = st.columns(2)
-                with col_cost:
-                    st.metric("💰 Cost", f"${resp['cost']:.4f}")
-                with col_tokens:
-                    st.write(f"🔢 Tokens: {resp['input_tokens']} in → {resp['output_tokens']} out")
-                
-                st.write("**Parameters:**")
-                col_a, col_b = st.columns(2)
-                with col_a:
-                    st.write(f"• Temperature: {resp['parameters']['temperature']}")
-                    st.write(f"• Top-p: {resp['parameters']['top_p']}")
-                    st.write(f"• Max Tokens: {resp['parameters']['max_tokens']}")
-                with col_b:
-                    st.write(f"• Frequency Penalty: {resp['parameters']['frequency_penalty']}")
-                    st.write(f"• Presence Penalty: {resp['parameters']['presence_penalty']}")
-                    st.write(f"• Model: {resp['model']}")
-
-# Educational content at the bottom
-st.divider()
-st.header("🎓 Understanding AI Parameters")
-col1, col2, col3 = st.columns(3)
-with col1:
-    st.subheader("🌡️ Temperature")
-    st.write("""
-    **Controls randomness and creativity**
-    - 0.0: Very focused, deterministic
-    - 1.0: Balanced creativity
-    - 2.0: Very random, creative
-    
-    *Try the same prompt with 0.1 vs 1.5!*
-    """)
-with col2:
-    st.subheader("🎯 Top-p")
-    st.write("""
-    **Controls vocabulary diversity**
-    - 0.1: Very focused word choices
-    - 1.0: Full vocabulary available
-    
-    *Lower values = more predictable language*
-    """)
-with col3:
-    st.subheader("📊 Penalties")
-    st.write("""
-    **Shape content patterns**
-    - Frequency: Reduces repetition
-    - Presence: Encourages new topics
-    
-    *Higher values = more variation*
-    """)
+        render_history(st.session_state.responses)
 
-st.info("""
-💡 **Key Insight**: AI models are sophisticated **probability engines** that predict the most likely next words based on patterns in training data. 
-These parameters adjust those probabilities, showing that there's no single "correct" response - just different probable outcomes!
-""")
-
-st.divider()
-
-# Additional educational section about tokens
-st.header("🔤 Understanding Tokens & Costs")
-col1, col2 = st.columns(2)
-with col1:
-    st.subheader("🔢 What are Tokens?")
-    st.write("""
-    **Tokens are the basic units AI models process** - roughly pieces of words:
-    
-    • **"hello"** = 1 token
-    • **"ChatGPT"** = 2 tokens (Chat + GPT)  
-    • **"AI"** = 1 token
-    • **"don't"** = 2 tokens (don + 't)
-    
-    **Rules of thumb:**
-    • ~4 characters = 1 token (English)
-    • ~750 words = 1,000 tokens
-    • Spaces and punctuation count!
-    """)
-with col2:
-    st.subheader("💰 How Costs Work")
-    st.write("""
-    **You pay for both input AND output tokens:**
-    
-    • **Input**: Your prompt (what you send)
-    • **Output**: The AI's response (what you get back)
-    • **Different models** = different prices
-    • **Longer responses** = higher costs
-    
-    **Cost factors:**
-    • Higher temperature → potentially longer responses
-    • Max tokens setting → caps your maximum cost
-    • Model choice → biggest cost difference
-    """)
-
-# Token counter demo
-st.subheader("🧮 Token Counter Demo")
-demo_text = st.text_input(
-    "Try typing text to see token count:",
-    value="Hello, how are you doing today?",
-    help="See how different text gets converted to tokens"
-)
-if demo_text:
-    token_count = count_tokens(demo_text, "gpt-3.5-turbo")
-    col_a, col_b, col_c = st.columns(3)
-    with col_a:
-        st.metric("Characters", len(demo_text))
-    with col_b:
-        st.metric("Estimated Tokens", token_count)
-    with col_c:
-        cost_estimate = (token_count / 1000) * PRICING["gpt-3.5-turbo"]["input"]
-        st.metric("Input Cost", f"${cost_estimate:.6f}")
-
-# Usage Limits Disclaimer
-st.markdown("---")
-st.markdown("""
+# Usage policy text, filled in from the limit constants once at import
+_POLICY_MD = f"""
 ### 📋 Usage Limits & Fair Use Policy
 **This demo has the following limits to keep it free and available for everyone:**
 
 **Global Daily Cap:**
-- **$1.00 per day** - Total spending limit across all users
+- **${DAILY_CAP:.2f} per day** - Total spending limit across all users
 - Resets at midnight UTC
 - Prevents excessive costs for the demo
 
 **Rate Limits:**
-- **5 requests per 10 minutes** - Prevents rapid-fire spam
-- **15 requests per hour** - Allows meaningful exploration
-- **50,000 tokens per session** - About 100 conversations before refresh needed
+- **{MAX_REQUESTS_10MIN} requests per 10 minutes** - Prevents rapid-fire spam
+- **{MAX_REQUESTS_HOUR} requests per hour** - Allows meaningful exploration
+- **{MAX_SESSION_TOKENS:,} tokens per session** - About 100 conversations before refresh needed
 
 **Input Restrictions:**
-- **500 character limit** - Keeps requests focused and costs manageable
+- **{MAX_INPUT_CHARS} character limit** - Keeps requests focused and costs manageable
 - **Blocks expensive request types** - No "write a book" or bulk generation requests
 - **Spam detection** - Repetitive or bot-like inputs are filtered out
 
 **Why These Limits?**
 - Each AI request costs real money (~$0.001-0.03 per interaction depending on model)
 - Without limits, the demo could cost hundreds of dollars per day
-- These restrictions keep the total daily cost under $1 while serving many users
+- These restrictions keep the total daily cost under ${DAILY_CAP:g} while serving many users
 
 **Need More Usage?** This is an educational demo. For production use, consider:
 - Setting up your own OpenAI API account
@@ -585,6 +763,108 @@ st.markdown("""
 - Building your own implementation using the open-source code
 
 *Last updated: August 2025*
-""")
+"""
 
-st.info("💡 **Educational Purpose:** This demo exists to help people understand AI costs, capabilities, and limitations in a transparent way.")
\ No newline at end of file
+# Educational content at the bottom
+# Runs as a fragment so typing in the token counter demo only reruns this section
+@st.fragment
+def _render_education():
+    """Render the parameter, token and usage-policy explainers"""
+    st.divider()
+    st.header("🎓 Understanding AI Parameters")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.subheader("🌡️ Temperature")
+        st.write("""
+        **Controls randomness and creativity**
+        - 0.0: Very focused, deterministic
+        - 1.0: Balanced creativity
+        - 2.0: Very random, creative
+        
+        *Try the same prompt with 0.1 vs 1.5!*
+        """)
+    with col2:
+        st.subheader("🎯 Top-p")
+        st.write("""
+        **Controls vocabulary diversity**
+        - 0.1: Very focused word choices
+        - 1.0: Full vocabulary available
+        
+        *Lower values = more predictable language*
+        """)
+    with col3:
+        st.subheader("📊 Penalties")
+        st.write("""
+        **Shape content patterns**
+        - Frequency: Reduces repetition
+        - Presence: Encourages new topics
+        
+        *Higher values = more variation*
+        """)
+
+    st.info("""
+    💡 **Key Insight**: AI models are sophisticated **probability engines** that predict the most likely next words based on patterns in training data. 
+    These parameters adjust those probabilities, showing that there's no single "correct" response - just different probable outcomes!
+    """)
+
+    st.divider()
+
+    # Additional educational section about tokens
+    st.header("🔤 Understanding Tokens & Costs")
+    col1, col2 = st.columns(2)
+    with col1:
+        st.subheader("🔢 What are Tokens?")
+        st.write("""
+        **Tokens are the basic units AI models process** - roughly pieces of words:
+        
+        • **"hello"** = 1 token
+        • **"ChatGPT"** = 2 tokens (Chat + GPT)  
+        • **"AI"** = 1 token
+        • **"don't"** = 2 tokens (don + 't)
+        
+        **Rules of thumb:**
+        • ~4 characters = 1 token (English)
+        • ~750 words = 1,000 tokens
+        • Spaces and punctuation count!
+        """)
+    with col2:
+        st.subheader("💰 How Costs Work")
+        st.write("""
+        **You pay for both input AND output tokens:**
+        
+        • **Input**: Your prompt (what you send)
+        • **Output**: The AI's response (what you get back)
+        • **Different models** = different prices
+        • **Longer responses** = higher costs
+        
+        **Cost factors:**
+        • Higher temperature → potentially longer responses
+        • Max tokens setting → caps your maximum cost
+        • Model choice → biggest cost difference
+        """)
+
+    # Token counter demo
+    st.subheader("🧮 Token Counter Demo")
+    demo_text = st.text_input(
+        "Try typing text to see token count:",
+        value="Hello, how are you doing today?",
+        help="See how different text gets converted to tokens"
+    )
+    if demo_text:
+        token_count = count_tokens(demo_text, "gpt-3.5-turbo")
+        col_a, col_b, col_c = st.columns(3)
+        with col_a:
+            st.metric("Characters", len(demo_text))
+        with col_b:
+            st.metric("Estimated Tokens", token_count)
+        with col_c:
+            cost_estimate = (token_count / 1000) * PRICING["gpt-3.5-turbo"]["input"]
+            st.metric("Input Cost", f"${cost_estimate:.6f}")
+
+    # Usage Limits Disclaimer
+    st.markdown("---")
+    st.markdown(_POLICY_MD)
+
+    st.info("💡 **Educational Purpose:** This demo exists to help people understand AI costs, capabilities, and limitations in a transparent way.")
+
+_render_education()
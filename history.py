@@ -0,0 +1,48 @@
+import streamlit as st
+from itertools import islice
+
+# Shared response history rendering for the Streamlit apps.
+# Kept in one place so both apps show the history the same way.
+
+# Number of history entries rendered in full; older ones collapse to a summary line
+HISTORY_FULL_RENDER = 5
+
+def render_response(i, resp):
+    """Render one response history entry"""
+    cached_label = " - 💾 cached" if resp.get("cached") else ""
+    with st.expander(f"Response {i+1} - {resp['timestamp']} - ${resp['cost']:.4f}{cached_label}", expanded=(i==0)):
+        st.write("**Response:**")
+        st.write(resp['response'])
+        
+        col_cost, col_tokens = st.columns(2)
+        with col_cost:
+            st.metric("💰 Cost", f"${resp['cost']:.4f}")
+        with col_tokens:
+            st.write(f"🔢 Tokens: {resp['input_tokens']} in → {resp['output_tokens']} out")
+        
+        st.write("**Parameters:**")
+        col_a, col_b = st.columns(2)
+        with col_a:
+            st.write(f"• Temperature: {resp['parameters']['temperature']}")
+            st.write(f"• Top-p: {resp['parameters']['top_p']}")
+            st.write(f"• Max Tokens: {resp['parameters']['max_tokens']}")
+        with col_b:
+            st.write(f"• Frequency Penalty: {resp['parameters']['frequency_penalty']}")
+            st.write(f"• Presence Penalty: {resp['parameters']['presence_penalty']}")
+            st.write(f"• Model: {resp['model']}")
+
+def render_history(responses):
+    """Render the response history, newest first"""
+    # Display the most recent responses in full
+    for i, resp in enumerate(islice(responses, HISTORY_FULL_RENDER)):
+        render_response(i, resp)
+    
+    # Older responses are summarized unless the user asks to see them
+    older = list(islice(responses, HISTORY_FULL_RENDER, None))
+    if older:
+        show_older = st.toggle("Show older responses", key="show_older")
+        for i, resp in enumerate(older, start=HISTORY_FULL_RENDER):
+            if show_older:
+                render_response(i, resp)
+            else:
+                st.caption(f"Response {i+1} - {resp['timestamp']} - ${resp['cost']:.4f}")
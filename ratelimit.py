@@ -0,0 +1,23 @@
+# Shared rate limiting helpers for the Streamlit apps.
+# Kept in one place so both apps count requests the same way.
+
+def window_count(counter, now, window):
+    """Estimate requests made in the last `window` seconds from a sliding-window counter"""
+    # counter holds the counts of the current fixed window and the one before it;
+    # the previous count is weighted by how much of it the sliding window still covers
+    elapsed = now - counter["start"]
+    if elapsed >= window:
+        # Roll forward - after two or more windows both counts have expired
+        counter["prev"] = counter["curr"] if elapsed < 2 * window else 0
+        counter["curr"] = 0
+        counter["start"] += (elapsed // window) * window
+        elapsed = now - counter["start"]
+    return counter["prev"] * (1 - elapsed / window) + counter["curr"]
+
+def release_count(counter, now, window, n=1):
+    """Take back n requests counted earlier on a sliding-window counter"""
+    window_count(counter, now, window)  # Roll forward first
+    # The window may have rolled over since they were counted, moving them into the previous count
+    from_curr = min(n, counter["curr"])
+    counter["curr"] -= from_curr
+    counter["prev"] = max(counter["prev"] - (n - from_curr), 0)
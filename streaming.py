@@ -0,0 +1,23 @@
+from tokens import count_tokens
+
+# Shared helpers for streamed completions in the Streamlit apps.
+# Kept in one place so both apps account for streamed tokens the same way.
+
+def stream_text(response, stats):
+    """Yield the text deltas of a streamed completion, collecting them and the final usage in stats"""
+    for chunk in response:
+        if chunk.choices and chunk.choices[0].delta.content:
+            stats["parts"].append(chunk.choices[0].delta.content)
+            yield chunk.choices[0].delta.content
+        if chunk.usage:
+            stats["usage"] = chunk.usage
+
+def streamed_tokens(stats, prompt, model):
+    """Return (input tokens, output tokens) for a streamed completion, even one cut short"""
+    if "parts" not in stats:
+        return 0, 0  # The request never reached the API, so nothing was billed
+    usage = stats.get("usage")
+    if usage is None:
+        # The stream ended without a usage chunk - count the tokens locally instead
+        return count_tokens(prompt, model), count_tokens("".join(stats["parts"]), model)
+    return usage.prompt_tokens, usage.completion_tokens
@@ -0,0 +1,70 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+
+# Shared token counting and pricing helpers for the Streamlit apps.
+# Kept out of the app scripts so the caches below survive Streamlit reruns.
+
+# Keep tiktoken's downloaded BPE files in a stable cache directory so a restart
+# doesn't refetch them (tiktoken creates the directory on first download)
+os.environ.setdefault("TIKTOKEN_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".cache", "tiktoken"))
+
+# OpenAI pricing (per 1K tokens) - updated as of Jan 2024
+PRICING = {
+    "gpt-3.5-turbo": {"input": 0.0010, "output": 0.0020},
+    "gpt-4": {"input": 0.03, "output": 0.06},
+    "gpt-4-turbo": {"input": 0.01, "output": 0.03},
+    "gpt-4-turbo-preview": {"input": 0.01, "output": 0.03}
+}
+
+@lru_cache(maxsize=8)
+def _load_encoding(model_family):
+    """Load the tiktoken encoding for a model family once per process"""
+    # Imported here so app start-up doesn't pay for tiktoken until a count is needed
+    import tiktoken
+    return tiktoken.encoding_for_model(model_family)
+
+def _get_encoding(model_family):
+    """Return the tiktoken encoding for a model family (None if it can't be loaded right now)"""
+    try:
+        return _load_encoding(model_family)
+    except Exception:
+        # lru_cache doesn't keep exceptions, so a failed BPE download is retried next call
+        return None
+
+# Token counts keyed by (content hash, model family), oldest evicted first
+TOKEN_COUNT_CACHE_SIZE = 1024
+_token_counts = OrderedDict()
+_token_counts_lock = threading.Lock()  # Every session thread shares the memo
+
+def count_tokens(text, model):
+    """Count tokens in text using tiktoken, memoized by content hash"""
+    family = "gpt-4" if model.startswith("gpt-4") else "gpt-3.5-turbo"
+    key = (hashlib.blake2b(text.encode(), digest_size=16).digest(), family)
+    with _token_counts_lock:
+        if key in _token_counts:
+            _token_counts.move_to_end(key)
+            return _token_counts[key]
+
+    encoding = _get_encoding(family)
+    if encoding is None:
+        # Fallback estimation: ~4 chars per token
+        return len(text) // 4
+
+    count = len(encoding.encode(text))
+    with _token_counts_lock:
+        _token_counts[key] = count
+        if len(_token_counts) > TOKEN_COUNT_CACHE_SIZE:
+            _token_counts.popitem(last=False)
+    return count
+
+def calculate_cost(input_tokens, output_tokens, model):
+    """Calculate cost based on token usage"""
+    if model not in PRICING:
+        return 0.0
+
+    input_cost = (input_tokens / 1000) * PRICING[model]["input"]
+    output_cost = (output_tokens / 1000) * PRICING[model]["output"]
+    return input_cost + output_cost